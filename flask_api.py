@@ -1,10 +1,9 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS, cross_origin
-import pandas as pd
-import numpy as np
 import random
 import os
 import sys
+import threading
 sys.path.append('.')
 from ml_recommendation_system import MLRecommendationSystem
 
@@ -19,16 +18,31 @@ CORS(
     supports_credentials=True
 )
 
-meals_df = pd.read_csv('src/data/meals.csv')
-exercises_df = pd.read_csv('src/data/exercises.csv')
-workout_plans_df = pd.read_csv('src/data/workout_plans.csv')
+# The CSV catalog and the ML sub-models are loaded on first use so the process can
+# answer /api/health without importing pandas or scikit-learn.
+_catalog = None
+_catalog_lock = threading.Lock()
 
-meals_df = meals_df.replace({np.nan: None})
-exercises_df = exercises_df.replace({np.nan: None})
-workout_plans_df = workout_plans_df.replace({np.nan: None})
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                import pandas as pd
+                import numpy as np
+                meals_df = pd.read_csv('src/data/meals.csv').replace({np.nan: None})
+                exercises_df = pd.read_csv('src/data/exercises.csv').replace({np.nan: None})
+                workout_plans_df = pd.read_csv('src/data/workout_plans.csv').replace({np.nan: None})
+                _catalog = (meals_df, exercises_df, workout_plans_df)
+    return _catalog
 
 ml_system = MLRecommendationSystem()
+if os.environ.get('ML_BACKGROUND_WARMUP', '0') == '1':
+    ml_system.warm_up(background=True)
+
 def convert_to_python_types(obj):
+    import numpy as np
+    
     if isinstance(obj, dict):
         return {key: convert_to_python_types(value) for key, value in obj.items()}
     elif isinstance(obj, list):
@@ -56,6 +70,7 @@ def get_today_day_of_week():
 def recommend_meals():
     if request.method == 'OPTIONS':
         return '', 204
+    meals_df, _, _ = get_catalog()
     req_json = request.get_json() or {}
     user_profile = req_json.get('user_profile', {})
     diet_pref = user_profile.get('diet_preference', 'all').lower()
@@ -79,6 +94,7 @@ def recommend_meals():
 def recommend_workouts():
     if request.method == 'OPTIONS':
         return '', 204
+    _, exercises_df, workout_plans_df = get_catalog()
     req_json = request.get_json() or {}
     user_profile = req_json.get('user_profile', {})
     plan_names = workout_plans_df['plan_name'].unique()
@@ -146,7 +162,22 @@ def recommend_workouts():
     supports_credentials=True
 )
 def health():
-    return jsonify({'status': 'ok'})
+    readiness = ml_system.get_readiness()
+    return jsonify({
+        'status': 'ok',
+        'ml_ready': all(state == 'ready' for state in readiness.values()),
+        'ml_models': readiness
+    })
+
+@app.route('/api/ml/coalescing-stats', methods=['GET'])
+@cross_origin(
+    origins=["http://localhost:5173"],
+    methods=["GET"],
+    allow_headers=["Content-Type", "Authorization"],
+    supports_credentials=True
+)
+def ml_coalescing_stats():
+    return jsonify({'coalescing': ml_system.single_flight.get_stats()})
 
 @app.route('/api/ml/recommend-meals', methods=['POST', 'OPTIONS'])
 @cross_origin(
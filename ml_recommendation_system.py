@@ -1,17 +1,66 @@
-import pandas as pd
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
+# pandas, numpy and scikit-learn are imported inside the methods that need them so
+# importing this module (and flask_api) stays cheap; see MLRecommendationSystem.ensure_model.
 import pickle
 import os
-from datetime import datetime, timedelta
 import warnings
 import time
+import threading
 warnings.filterwarnings('ignore')
 
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    # Concurrent callers with the same key share one computation instead of each
+    # running it; the entry is dropped as soon as the computation finishes.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.computations = 0
+        self.coalesced = 0
+    
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                leader = True
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.computations += 1
+            call.done.set()
+        return call.result
+    
+    def get_stats(self):
+        with self._lock:
+            total = self.computations + self.coalesced
+            return {
+                'computations': self.computations,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+                'coalesced_ratio': self.coalesced / total if total else 0.0
+            }
+
 class MLRecommendationSystem:
     def __init__(self):
         self.meals_df = None
@@ -26,14 +75,72 @@ class MLRecommendationSystem:
         self.exercise_similarity_matrix = None
         
         self.user_clusters = None
-        self.scaler = StandardScaler()
+        self.scaler = None
         self.label_encoders = {}
         
+        self.single_flight = SingleFlight()
+        
+        # Sub-models are built on first use (or by warm_up) rather than in the constructor
+        self._model_builders = {
+            'data': self._build_data,
+            'meal_model': self.build_meal_recommendations,
+            'exercise_model': self.build_exercise_recommendations,
+            'user_clusters': self.build_user_clusters
+        }
+        self._model_dependencies = {
+            'meal_model': ['data'],
+            'exercise_model': ['data'],
+            'user_clusters': ['data']
+        }
+        self._model_status = {name: 'not_loaded' for name in self._model_builders}
+        self._model_locks = {name: threading.Lock() for name in self._model_builders}
+        self._warm_up_thread = None
+    
+    def ensure_model(self, name):
+        if self._model_status[name] == 'ready':
+            return
+        for dependency in self._model_dependencies.get(name, []):
+            self.ensure_model(dependency)
+        
+        with self._model_locks[name]:
+            if self._model_status[name] == 'ready':
+                return
+            self._model_status[name] = 'loading'
+            start = time.time()
+            try:
+                self._model_builders[name]()
+            except Exception:
+                self._model_status[name] = 'failed'
+                raise
+            self._model_status[name] = 'ready'
+            print(f"Sub-model '{name}' ready in {(time.time() - start) * 1000:.0f} ms")
+    
+    def warm_up(self, background=True):
+        def build_all():
+            for name in self._model_builders:
+                try:
+                    self.ensure_model(name)
+                except Exception as e:
+                    print(f"Warm-up failed for sub-model '{name}': {e}")
+        
+        if not background:
+            build_all()
+            return None
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(target=build_all, name='ml-warm-up', daemon=True)
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+    
+    def get_readiness(self):
+        return dict(self._model_status)
+    
+    def _build_data(self):
         self.load_data()
         self.preprocess_data()
-        self.build_models()
     
     def load_data(self):
+        import pandas as pd
+        
         data_path = 'src/data/'
         self.meals_df = pd.read_csv(data_path + 'meals.csv')
         self.exercises_df = pd.read_csv(data_path + 'exercises.csv')
@@ -44,6 +151,8 @@ class MLRecommendationSystem:
         print(f"Loaded {len(self.meals_df)} meals, {len(self.exercises_df)} exercises, {len(self.profiles_df)} profiles")
     
     def preprocess_data(self):
+        import pandas as pd
+        
         self.meals_df = self.meals_df.fillna('')
         self.exercises_df = self.exercises_df.fillna('')
         self.profiles_df = self.profiles_df.fillna('')
@@ -78,6 +187,9 @@ class MLRecommendationSystem:
             self.exercises_df['equipment'] + ' ' + 
             self.exercises_df['difficulty']
         )
+    
+    def encode_profiles(self):
+        from sklearn.preprocessing import LabelEncoder
         
         self.label_encoders['goal'] = LabelEncoder()
         self.label_encoders['experience_level'] = LabelEncoder()
@@ -90,24 +202,34 @@ class MLRecommendationSystem:
         self.profiles_df['gender_encoded'] = self.label_encoders['gender'].fit_transform(self.profiles_df['gender'])
     
     def build_models(self):
-        self.build_meal_recommendations()
-        self.build_exercise_recommendations()
-        self.build_user_clusters()
+        for name in self._model_builders:
+            self.ensure_model(name)
     
     def build_meal_recommendations(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+        
         self.meal_vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
         meal_features = self.meal_vectorizer.fit_transform(self.meals_df['combined_features'])
         self.meal_similarity_matrix = cosine_similarity(meal_features)
         print("Built meal recommendation model")
     
     def build_exercise_recommendations(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+        
         self.exercise_vectorizer = TfidfVectorizer(stop_words='english', max_features=500)
         exercise_features = self.exercise_vectorizer.fit_transform(self.exercises_df['combined_features'])
         self.exercise_similarity_matrix = cosine_similarity(exercise_features)
         print("Built exercise recommendation model")
     
     def build_user_clusters(self):
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.cluster import KMeans
+        
+        self.encode_profiles()
         user_features = self.profiles_df[['goal_encoded', 'experience_encoded', 'equipment_encoded', 'gender_encoded', 'age', 'height_cm', 'initial_weight_kg']].copy()
+        self.scaler = StandardScaler()
         user_features_scaled = self.scaler.fit_transform(user_features)
         
         n_clusters = min(5, len(user_features))
@@ -117,11 +239,29 @@ class MLRecommendationSystem:
         print(f"Built user clustering model with {n_clusters} clusters")
     
     def get_meal_recommendations(self, user_profile, n_recommendations=5, meal_type=None, dietary_preference='all'):
+        import numpy as np
+        
+        self.ensure_model('data')
         np.random.seed(int(time.time() * 1000) % 1000000)
         
         user_goal = user_profile.get('goal', 'maintain')
         user_diet = user_profile.get('diet_preference', 'all')
         
+        # Identical in-flight requests share the filter/score pass; each caller still samples its own meals
+        key = ('meals', user_goal, user_diet, meal_type.lower() if meal_type else None, dietary_preference)
+        filtered_meals = self.single_flight.do(
+            key, lambda: self._score_meals(user_goal, user_diet, meal_type, dietary_preference)
+        )
+        
+        if len(filtered_meals) > n_recommendations:
+            top_meals = filtered_meals.nlargest(min(n_recommendations * 2, len(filtered_meals)), 'score')
+            recommended_meals = top_meals.sample(n=min(n_recommendations, len(top_meals)))
+        else:
+            recommended_meals = filtered_meals
+        
+        return recommended_meals[['meal_id', 'meal_name', 'meal_type', 'calories', 'protein_g', 'carbs_g', 'fat_g', 'dietary_tags']].to_dict('records')
+    
+    def _score_meals(self, user_goal, user_diet, meal_type, dietary_preference):
         filtered_meals = self.meals_df.copy()
         
         if meal_type:
@@ -163,22 +303,33 @@ class MLRecommendationSystem:
             meal_scores.append(score)
         
         filtered_meals['score'] = meal_scores
-        
-        if len(filtered_meals) > n_recommendations:
-            top_meals = filtered_meals.nlargest(min(n_recommendations * 2, len(filtered_meals)), 'score')
-            recommended_meals = top_meals.sample(n=min(n_recommendations, len(top_meals)))
-        else:
-            recommended_meals = filtered_meals
-        
-        return recommended_meals[['meal_id', 'meal_name', 'meal_type', 'calories', 'protein_g', 'carbs_g', 'fat_g', 'dietary_tags']].to_dict('records')
+        return filtered_meals
     
     def get_exercise_recommendations(self, user_profile, n_recommendations=8, body_part=None):
+        import numpy as np
+        
+        self.ensure_model('data')
         np.random.seed(int(time.time() * 1000) % 1000000)
         
         user_goal = user_profile.get('goal', 'maintain')
         user_experience = user_profile.get('experience', 'beginner')
         user_equipment = user_profile.get('equipment_access', 'full_gym')
         
+        # Identical in-flight requests share the filter/score pass; each caller still samples its own exercises
+        key = ('exercises', user_goal, user_experience, user_equipment, body_part.lower() if body_part else None)
+        filtered_exercises = self.single_flight.do(
+            key, lambda: self._score_exercises(user_goal, user_experience, user_equipment, body_part)
+        )
+        
+        if len(filtered_exercises) > n_recommendations:
+            top_exercises = filtered_exercises.nlargest(min(n_recommendations * 2, len(filtered_exercises)), 'score')
+            recommended_exercises = top_exercises.sample(n=min(n_recommendations, len(top_exercises)))
+        else:
+            recommended_exercises = filtered_exercises
+        
+        return recommended_exercises[['exercise_id', 'exercise_name', 'body_part', 'equipment', 'difficulty']].to_dict('records')
+    
+    def _score_exercises(self, user_goal, user_experience, user_equipment, body_part):
         filtered_exercises = self.exercises_df.copy()
         
         if body_part:
@@ -223,14 +374,7 @@ class MLRecommendationSystem:
             exercise_scores.append(score)
         
         filtered_exercises['score'] = exercise_scores
-        
-        if len(filtered_exercises) > n_recommendations:
-            top_exercises = filtered_exercises.nlargest(min(n_recommendations * 2, len(filtered_exercises)), 'score')
-            recommended_exercises = top_exercises.sample(n=min(n_recommendations, len(top_exercises)))
-        else:
-            recommended_exercises = filtered_exercises
-        
-        return recommended_exercises[['exercise_id', 'exercise_name', 'body_part', 'equipment', 'difficulty']].to_dict('records')
+        return filtered_exercises
     
     def get_personalized_workout_plan(self, user_profile, workout_type='strength'):
         exercises = self.get_exercise_recommendations(user_profile, n_recommendations=12)
@@ -264,6 +408,10 @@ class MLRecommendationSystem:
         return workout_plan
     
     def get_similar_users_recommendations(self, user_profile, n_recommendations=5):
+        import numpy as np
+        from sklearn.neighbors import NearestNeighbors
+        
+        self.ensure_model('user_clusters')
         user_features = np.array([
             self.label_encoders['goal'].transform([user_profile.get('goal', 'maintain')])[0],
             self.label_encoders['experience_level'].transform([user_profile.get('experience', 'beginner')])[0],
@@ -276,7 +424,6 @@ class MLRecommendationSystem:
         
         user_features_scaled = self.scaler.transform(user_features)
         
-        from sklearn.neighbors import NearestNeighbors
         nn = NearestNeighbors(n_neighbors=min(n_recommendations + 1, len(self.profiles_df)), algorithm='ball_tree')
         nn.fit(self.scaler.transform(self.profiles_df[['goal_encoded', 'experience_encoded', 'equipment_encoded', 'gender_encoded', 'age', 'height_cm', 'initial_weight_kg']]))
         
@@ -286,6 +433,7 @@ class MLRecommendationSystem:
         return similar_users[['username', 'goal', 'experience_level', 'equipment_access']].to_dict('records')
     
     def get_progress_based_recommendations(self, user_id, n_recommendations=5):
+        self.ensure_model('data')
         user_logs = self.workout_logs_df[self.workout_logs_df['user_id'] == user_id]
         
         if len(user_logs) == 0:
@@ -320,6 +468,7 @@ class MLRecommendationSystem:
         return recommended_exercises[:n_recommendations]
     
     def get_similar_exercises(self, exercise_id, n=5):
+        self.ensure_model('exercise_model')
         if exercise_id not in self.exercises_df['exercise_id'].values:
             return []
         
@@ -343,6 +492,7 @@ class MLRecommendationSystem:
         return similar_exercises
     
     def save_models(self, filepath='ml_models/'):
+        self.build_models()
         os.makedirs(filepath, exist_ok=True)
         
         models = {
@@ -406,4 +556,32 @@ if __name__ == "__main__":
     for exercise in workout[:5]:
         print(f"- {exercise['exercise_name']}: {exercise['sets']} sets x {exercise['reps']} reps")
     
+    print("\n=== Burst Load Test (request coalescing) ===")
+    from concurrent.futures import ThreadPoolExecutor
+    burst_size = 64
+    burst_profiles = [
+        {'goal': 'bulk', 'experience': 'intermediate', 'equipment_access': 'full_gym'},
+        {'goal': 'cut', 'experience': 'beginner', 'equipment_access': 'home_gym'},
+        {'goal': 'maintain', 'experience': 'beginner', 'equipment_access': 'bodyweight'}
+    ]
+    barrier = threading.Barrier(burst_size)
+    
+    def burst_request(i):
+        barrier.wait()
+        profile = burst_profiles[i % len(burst_profiles)]
+        if i % 2:
+            return ml_system.get_personalized_workout_plan(profile)
+        return ml_system.get_exercise_recommendations(profile)
+    
+    before = ml_system.single_flight.get_stats()
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=burst_size) as pool:
+        list(pool.map(burst_request, range(burst_size)))
+    elapsed = time.time() - start
+    after = ml_system.single_flight.get_stats()
+    computations = after['computations'] - before['computations']
+    coalesced = after['coalesced'] - before['coalesced']
+    print(f"{burst_size} concurrent requests served in {elapsed * 1000:.1f} ms")
+    print(f"- {computations} filter/score computations, {coalesced} requests coalesced")
+    
     ml_system.save_models() 
\ No newline at end of file